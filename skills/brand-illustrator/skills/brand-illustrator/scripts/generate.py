@@ -17,23 +17,22 @@ Usage examples:
   python3 scripts/generate.py --prompt "Replace mug with notebook" --reference input.png --color coral --type icon --output out.png
 """
 
+from __future__ import annotations
+
 import argparse
 import base64
+import importlib.util
 import json
 import os
-import sys
-from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import NamedTuple
 
-# --- Optional dependency: google-genai ---
+# --- Optional dependency: pybase64 (SIMD-accelerated drop-in for base64) ---
 try:
-    from google import genai  # type: ignore
-    from google.genai import types  # type: ignore
+    import pybase64 as b64codec  # type: ignore
 except Exception:
-    genai = None
-    types = None  # type: ignore
+    b64codec = base64
 
 # --- Paths ---
 SKILL_DIR = Path(__file__).resolve().parent.parent
@@ -68,62 +67,58 @@ NEGATIVE_SNIPPET = (
     "no brand logos, no realistic faces, no cluttered background"
 )
 
-@dataclass
-class Params:
+class Params(NamedTuple):
     prompt: str
     color: str
     type: str
     width: int
     height: int
     output: Path
-    reference: Optional[Path] = None
+    reference: Path | None = None
     dark_mode: bool = False
     add_negative: bool = True
+    accent_hex: str = ""
 
-def read_text(path: Path) -> str:
-    try:
-        return path.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        return ""
+def palette_hint(accent_name: str, accent_hex: str) -> str:
+    return (
+        f"Palette: line {SYSTEM_COLORS['line']}, background {SYSTEM_COLORS['background']}, "
+        f"accent {accent_name} {accent_hex} (20–30% coverage), "
+        f"subtle shadows (5–10%)."
+    )
+
+# Prompt fragments are fixed, so build them once at import time.
+# We only embed a small, stable snippet from style.md to avoid overly long prompts.
+# Keep this short but authoritative.
+STYLE_SNIPPET = (
+    "Style: hand-drawn ink line illustration on warm off-white paper background, "
+    "confident black linework, minimal shading, one accent color in flat fills."
+)
+TYPE_HINTS = {
+    "icon": "Single-object icon. Centered composition with lots of negative space.",
+    "periphery": "Edge-friendly periphery element. Asymmetric with generous negative space.",
+    "scene": "Restrained scene with 2–4 objects and only suggested environment; leave room for headline text.",
+}
+DEFAULT_TYPE_HINT = "Keep composition restrained with negative space."
+PALETTE_HINTS = {name: palette_hint(name, hex_value) for name, hex_value in ACCENT_HEX.items()}
+AVOID_SNIPPET = "Avoid: logos or trademarks; keep any screen content generic."
 
 def build_prompt(user_prompt: str, accent_name: str, image_type: str, add_negative: bool) -> str:
     """
     Wraps the user prompt with global style constraints.
     """
-    accent_hex = ACCENT_HEX.get(accent_name.lower(), "")
-    style = read_text(REFERENCES_DIR / "style.md")
-    # We only embed a small, stable snippet from style.md to avoid overly long prompts.
-    # Keep this short but authoritative.
-    style_snippet = (
-        "Style: hand-drawn ink line illustration on warm off-white paper background, "
-        "confident black linework, minimal shading, one accent color in flat fills."
-    )
-    type_hint = {
-        "icon": "Single-object icon. Centered composition with lots of negative space.",
-        "periphery": "Edge-friendly periphery element. Asymmetric with generous negative space.",
-        "scene": "Restrained scene with 2–4 objects and only suggested environment; leave room for headline text.",
-    }.get(image_type, "Keep composition restrained with negative space.")
-    palette_hint = (
-        f"Palette: line {SYSTEM_COLORS['line']}, background {SYSTEM_COLORS['background']}, "
-        f"accent {accent_name} {accent_hex} (20–30% coverage), "
-        f"subtle shadows (5–10%)."
-    )
+    hint = PALETTE_HINTS.get(accent_name) or palette_hint(accent_name, ACCENT_HEX.get(accent_name.lower(), ""))
     parts = [
         user_prompt.strip(),
         "",
-        style_snippet,
-        type_hint,
-        palette_hint,
-        "Avoid: logos or trademarks; keep any screen content generic.",
+        STYLE_SNIPPET,
+        TYPE_HINTS.get(image_type, DEFAULT_TYPE_HINT),
+        hint,
+        AVOID_SNIPPET,
     ]
     if add_negative:
         parts.append(NEGATIVE_SNIPPET)
     return "\n".join(parts).strip()
 
-def b64_image(path: Path) -> str:
-    data = path.read_bytes()
-    return base64.b64encode(data).decode("utf-8")
-
 def ensure_parent(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -143,22 +138,46 @@ def save_metadata(params: Params, final_prompt: str) -> None:
         },
         "final_prompt": final_prompt,
         "colors": {
-            "accent_hex": ACCENT_HEX.get(params.color.lower()),
+            "accent_hex": params.accent_hex or None,
             "system": SYSTEM_COLORS,
         },
     }
     meta_path = params.output.with_suffix(params.output.suffix + ".json")
     meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
 
+def load_genai():
+    """
+    Imports google-genai on demand (optional dependency, slow to import).
+
+    Returns (genai, types), or (None, None) if the package isn't installed.
+    """
+    try:
+        from google import genai  # type: ignore
+        from google.genai import types  # type: ignore
+    except Exception:
+        return None, None
+    return genai, types
+
+def genai_installed() -> bool:
+    """Checks for google-genai without importing it."""
+    try:
+        return importlib.util.find_spec("google.genai") is not None
+    except ModuleNotFoundError:  # the "google" namespace package is missing too
+        return False
+
 def generate_with_gemini(params: Params, final_prompt: str) -> bytes:
     """
     Calls Gemini image generation via google-genai.
 
-    Uses gemini-3-pro-image-preview with streaming for image generation.
+    Uses gemini-3-pro-image-preview with a single non-streaming request.
     """
     api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY") or os.getenv("GENAI_API_KEY")
     if not api_key:
-        raise RuntimeError("Missing API key. Set GEMINI_API_KEY (or GOOGLE_API_KEY / GENAI_API_KEY).")
+        message = "Missing API key. Set GEMINI_API_KEY (or GOOGLE_API_KEY / GENAI_API_KEY)."
+        if not genai_installed():
+            message += " The google-genai package isn't installed either. Run: pip install google-genai"
+        raise RuntimeError(message)
+    genai, types = load_genai()
     if genai is None or types is None:
         raise RuntimeError("google-genai package not installed. Run: pip install google-genai")
 
@@ -171,14 +190,15 @@ def generate_with_gemini(params: Params, final_prompt: str) -> bytes:
     parts: list[types.Part] = [types.Part.from_text(text=final_prompt)]
 
     # Reference-guided edit (if a reference image is provided)
+    # The SDK base64-encodes bytes itself when building the request, so pass the
+    # raw file contents rather than encoding them here first. The data field is
+    # validated as bytes and the JSON body is built in memory, so a single
+    # read_bytes() is the floor (an mmap would just be copied).
     if params.reference:
-        ref_b64 = b64_image(params.reference)
         parts.append(
-            types.Part.from_inline_data(
-                types.InlineData(
-                    mime_type="image/png",
-                    data=ref_b64,
-                )
+            types.Part.from_bytes(
+                data=params.reference.read_bytes(),
+                mime_type="image/png",
             )
         )
 
@@ -190,29 +210,33 @@ def generate_with_gemini(params: Params, final_prompt: str) -> bytes:
         image_config=types.ImageConfig(image_size="1K"),
     )
 
-    # Stream response and extract image data
-    data = None
-    for chunk in client.models.generate_content_stream(
+    # Only the final image blob matters, so a single non-streaming call avoids
+    # validating every intermediate chunk.
+    response = client.models.generate_content(
         model=model,
         contents=contents,
         config=generate_content_config,
-    ):
-        if (
-            chunk.candidates is None
-            or chunk.candidates[0].content is None
-            or chunk.candidates[0].content.parts is None
-        ):
+    )
+
+    data = None
+    for cand in response.candidates or ():
+        content = cand.content
+        if content is None or not content.parts:
             continue
-        if chunk.candidates[0].content.parts[0].inline_data and chunk.candidates[0].content.parts[0].inline_data.data:
-            data = chunk.candidates[0].content.parts[0].inline_data.data
+        for part in content.parts:
+            inline = part.inline_data
+            if inline is not None and inline.data:
+                data = inline.data
+                break
+        if data:
             break
 
     if not data:
         raise RuntimeError("No image data returned from gemini-3-pro-image-preview.")
 
-    # Data may be base64 string or bytes
+    # Data may be base64 string or bytes; only decode when we actually got text.
     if isinstance(data, str):
-        return base64.b64decode(data)
+        return b64codec.b64decode(data, validate=False)
     return data
 
 def write_prompt_artifact(params: Params, final_prompt: str) -> None:
@@ -247,8 +271,9 @@ def parse_args() -> Params:
     else:
         width, height = args.width, args.height
 
-    ref = Path(args.reference).expanduser().resolve() if args.reference else None
-    out = Path(args.output).expanduser().resolve()
+    # abspath instead of resolve(): no symlink walk needed for these paths.
+    ref = Path(os.path.abspath(os.path.expanduser(args.reference))) if args.reference else None
+    out = Path(os.path.abspath(os.path.expanduser(args.output)))
     return Params(
         prompt=args.prompt,
         color=args.color,
@@ -259,6 +284,8 @@ def parse_args() -> Params:
         reference=ref,
         dark_mode=bool(args.dark_mode),
         add_negative=not bool(args.no_negative),
+        # argparse already restricts --color to ACCENT_HEX keys.
+        accent_hex=ACCENT_HEX[args.color],
     )
 
 def main() -> None:
@@ -272,8 +299,6 @@ def main() -> None:
         img_bytes = generate_with_gemini(params, final_prompt)
     except Exception as e:
         print(f"[WARN] Could not generate image via Gemini: {e}")
-        if genai is None:
-            print("Install dependency: pip install google-genai")
         print("Falling back to prompt artifact.")
         write_prompt_artifact(params, final_prompt)
         return
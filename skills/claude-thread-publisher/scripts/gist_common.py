@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Shared GitHub API and JSON file helpers for the Claude Code thread publisher.
+
+Kept free of import-time side effects, and requests is only imported when a
+session is made, so every script can load it cheaply.
+"""
+
+import json
+from pathlib import Path
+
+try:
+    import orjson  # Optional: faster JSON parsing and serialization
+except ImportError:
+    orjson = None
+
+GITHUB_API = "https://api.github.com"
+GITHUB_API_HEADERS = {
+    "Accept": "application/vnd.github+json",
+    "Content-Type": "application/json",
+    "X-GitHub-Api-Version": "2022-11-28"
+}
+
+
+def make_session():
+    """Create a pooled keep-alive session for GitHub API calls."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers.update(GITHUB_API_HEADERS)
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry))
+    return session
+
+
+if orjson is not None:
+    def json_loads(data):
+        """
+        Parse JSON with orjson, retrying with json.loads on a decode error.
+
+        orjson rejects some input json.loads accepts (NaN/Infinity, integers
+        wider than 64 bits, lone surrogate escapes); the retry keeps results
+        independent of whether orjson is installed.
+        """
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+else:
+    json_loads = json.loads
+
+
+def read_json_file(path):
+    """Load a JSON file, using orjson when it is installed."""
+    return json_loads(Path(path).read_bytes())
+
+
+def write_json_file(path, data):
+    """
+    Write a UTF-8 JSON file with 2-space indentation and a trailing newline.
+
+    Uses orjson when it is installed, falling back to json for values it
+    cannot encode (integers wider than 64 bits, lone surrogates).
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            encoded = None
+        if encoded is not None:
+            Path(path).write_bytes(encoded)
+            return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
@@ -6,15 +6,62 @@ This script helps locate the current Claude Code session file and project inform
 """
 
 import argparse
+import functools
+import heapq
 import json
 import os
+import re
+import stat
 import sys
 from pathlib import Path
-from datetime import datetime
 
+try:
+    import orjson  # Optional: faster JSONL parsing and JSON output
+except ImportError:
+    orjson = None
 
+from gist_common import json_loads
+
+
+def print_json(obj):
+    """Write obj to stdout as indented JSON, without an intermediate str when orjson is installed."""
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            # Big integers or lone surrogates that json.loads let through
+            encoded = None
+        if encoded is not None:
+            sys.stdout.flush()
+            sys.stdout.buffer.write(encoded)
+            sys.stdout.buffer.flush()
+            return
+    json.dump(obj, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+# Cache of metadata.json "path" -> project directory, shared across runs.
+PROJECT_CACHE_PATH = Path.home() / ".claude" / "thread-publisher" / "project_index.json"
+
+# Block sizes for counting records and for reading the last record from EOF.
+COUNT_CHUNK_SIZE = 1 << 20
+TAIL_READ_SIZE = 8192
+
+# Raw-bytes prefilter for lines that can hold a user message.
+_USER_ROLE_RE = re.compile(rb'"role"\s*:\s*"user"')
+
+# Lines passing is_record_line(), matched within a block of whole lines.
+_RECORD_LINE_RE = re.compile(rb'^[ \t\r\x0b\x0c]*\{.*\}[ \t\r\x0b\x0c]*$', re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=1)
 def find_claude_projects_root():
-    """Find the Claude projects root directory."""
+    """
+    Find the Claude projects root directory.
+
+    Memoized for the life of the process; call
+    find_claude_projects_root.cache_clear() if HOME changes.
+    """
     # Check common locations
     candidates = [
         Path.home() / ".claude" / "projects",
@@ -22,12 +69,98 @@ def find_claude_projects_root():
     ]
 
     for candidate in candidates:
-        if candidate.exists() and candidate.is_dir():
+        # One stat() covers both the existence and the directory check
+        try:
+            st = os.stat(candidate)
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
             return candidate
 
     return None
 
 
+def metadata_mtime(project_dir):
+    """Return the mtime_ns of a project's metadata.json, or None if it has none."""
+    try:
+        return os.stat(os.path.join(project_dir, "metadata.json")).st_mtime_ns
+    except OSError:
+        return None
+
+
+def scan_projects(projects_root):
+    """
+    Index the project directories in one pass.
+
+    Returns {"by_path": {metadata path: dir}, "by_name": {lowercased dir name: dir},
+    "metadata_mtimes": {dir: metadata.json mtime_ns or None}}; the first
+    directory wins when several share a key.
+    """
+    by_path = {}
+    by_name = {}
+    metadata_mtimes = {}
+    with os.scandir(projects_root) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            by_name.setdefault(entry.name.lower(), entry.path)
+
+            # Check if any metadata file might link this to a working directory
+            mtime = metadata_mtimes[entry.path] = metadata_mtime(entry.path)
+            if mtime is not None:
+                try:
+                    with open(os.path.join(entry.path, "metadata.json"), 'rb') as f:
+                        metadata = json_loads(f.read())
+                except (json.JSONDecodeError, IOError):
+                    continue
+                path = metadata.get("path")
+                if isinstance(path, str):
+                    by_path.setdefault(path, entry.path)
+    return {"by_path": by_path, "by_name": by_name, "metadata_mtimes": metadata_mtimes}
+
+
+def load_project_cache(projects_root, mtime_ns):
+    """
+    Return the cached project index if it was built for this projects_root state.
+
+    The root mtime only changes when project directories come and go, so every
+    project's metadata.json mtime is checked too; creating, editing or removing
+    one invalidates the cache.
+    """
+    try:
+        with open(PROJECT_CACHE_PATH, 'rb') as f:
+            cache = json_loads(f.read())
+        if cache["projects_root"] != str(projects_root) or cache["mtime_ns"] != mtime_ns:
+            return None
+        metadata_mtimes = cache["metadata_mtimes"]
+        if all(metadata_mtime(d) == m for d, m in metadata_mtimes.items()):
+            return {"by_path": cache["by_path"], "by_name": cache["by_name"],
+                    "metadata_mtimes": metadata_mtimes}
+    except (json.JSONDecodeError, IOError, KeyError, TypeError, AttributeError):
+        pass
+    return None
+
+
+def save_project_cache(projects_root, mtime_ns, projects):
+    """Atomically write the project index cache; failures only cost a rescan next time."""
+    tmp_path = PROJECT_CACHE_PATH.with_name(f"{PROJECT_CACHE_PATH.name}.{os.getpid()}.tmp")
+    try:
+        PROJECT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump({"projects_root": str(projects_root), "mtime_ns": mtime_ns, **projects}, f)
+        os.replace(tmp_path, PROJECT_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def lookup_project(projects, cwd_str, dir_name):
+    """Match by metadata path first, then by directory name."""
+    project_dir = projects["by_path"].get(cwd_str)
+    if project_dir and os.path.isdir(project_dir):
+        return project_dir
+    return projects["by_name"].get(dir_name)
+
+
 def find_project_for_cwd(cwd=None):
     """Find the Claude project corresponding to the current working directory."""
     if cwd is None:
@@ -40,31 +173,26 @@ def find_project_for_cwd(cwd=None):
     # Try to find a project that matches the current directory
     # Look for directories with similar names or paths
     cwd_str = str(cwd)
+    dir_name = cwd.name.lower().replace(" ", "-").replace("_", "-")
 
-    for project_dir in projects_root.iterdir():
-        if not project_dir.is_dir():
-            continue
+    # The project index is cached on disk, keyed by the projects root mtime
+    # and each project's metadata.json mtime; any change forces a rescan.
+    mtime_ns = os.stat(projects_root).st_mtime_ns
+    projects = load_project_cache(projects_root, mtime_ns)
+    if projects is None:
+        projects = scan_projects(projects_root)
+        save_project_cache(projects_root, mtime_ns, projects)
+    project_dir = lookup_project(projects, cwd_str, dir_name)
 
-        # Check if any metadata file might link this to our cwd
-        metadata_file = project_dir / "metadata.json"
-        if metadata_file.exists():
-            try:
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
-                    if metadata.get("path") == cwd_str:
-                        return project_dir
-            except (json.JSONDecodeError, IOError):
-                continue
+    return Path(project_dir) if project_dir else None
 
-    # Fallback: try to find project by matching directory name
-    dir_name = cwd.name.lower().replace(" ", "-").replace("_", "-")
-    for project_dir in projects_root.iterdir():
-        if not project_dir.is_dir():
-            continue
-        if project_dir.name.lower() == dir_name:
-            return project_dir
 
-    return None
+def iter_session_entries(sessions_dir):
+    """Yield os.DirEntry objects for the .jsonl session files in a directory."""
+    with os.scandir(sessions_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".jsonl") and entry.is_file():
+                yield entry
 
 
 def find_latest_session(project_dir):
@@ -76,57 +204,155 @@ def find_latest_session(project_dir):
     if not sessions_dir.exists():
         return None
 
-    # Find all .jsonl files in sessions directory
-    session_files = list(sessions_dir.glob("*.jsonl"))
-    if not session_files:
-        return None
+    # Return the most recently modified .jsonl file, in a single directory pass
+    latest = None
+    latest_mtime = -1
+    for entry in iter_session_entries(sessions_dir):
+        mtime = entry.stat().st_mtime_ns
+        if mtime > latest_mtime:
+            latest, latest_mtime = entry.path, mtime
 
-    # Return the most recently modified file
-    latest = max(session_files, key=lambda f: f.stat().st_mtime)
-    return latest
+    return Path(latest) if latest else None
+
+
+def parse_record(line):
+    """Parse one JSONL line, returning None unless it is a JSON object."""
+    try:
+        msg = json_loads(line)
+    except ValueError:
+        return None
+    return msg if isinstance(msg, dict) else None
+
+
+def is_record_line(line):
+    """
+    True if a stripped line looks like one complete JSON object.
+
+    Records are counted with this test instead of being parsed; a partially
+    written last line fails the closing-brace check.
+    """
+    return line.startswith(b"{") and line.endswith(b"}")
+
+
+def count_records(f):
+    """
+    Count the remaining record lines in a file positioned at the start of a line.
+
+    Blocks are extended to the next newline so no line is split, and lines
+    are matched with the same test as is_record_line() without splitting.
+    """
+    count = 0
+    while True:
+        chunk = f.read(COUNT_CHUNK_SIZE)
+        if not chunk:
+            return count
+        if not chunk.endswith(b"\n"):
+            chunk += f.readline()
+        count += sum(1 for _ in _RECORD_LINE_RE.finditer(chunk))
+
+
+def read_last_record(f, size):
+    """Parse the last record that parses, reading backwards from EOF."""
+    window = TAIL_READ_SIZE
+    tried = 0
+    while True:
+        start = max(0, size - window)
+        f.seek(start)
+        lines = f.read().split(b"\n")
+        if start:
+            # The first piece may start mid-line
+            lines = lines[1:]
+        records = [line for line in (l.strip() for l in lines) if is_record_line(line)]
+
+        # Records nearer EOF were already tried with a smaller window
+        for line in reversed(records[:len(records) - tried]):
+            msg = parse_record(line)
+            if msg is not None:
+                return msg
+        if not start:
+            return None
+        tried = len(records)
+        window *= 4
 
 
 def get_session_info(session_file):
-    """Extract basic information from a session file."""
-    if not session_file or not session_file.exists():
+    """Extract basic information from a session file (str or Path)."""
+    if not session_file or not os.path.exists(session_file):
         return None
 
+    # Forward pass over raw bytes until a title is found: only the first
+    # record and user-message candidates are parsed. The rest of the file is
+    # only counted, and last_message_time comes from a read near EOF.
     try:
-        messages = []
-        with open(session_file, 'r') as f:
+        count = 0
+        first_msg = None
+        title = None
+        with open(session_file, 'rb') as f:
             for line in f:
                 line = line.strip()
-                if line:
-                    try:
-                        msg = json.loads(line)
-                        messages.append(msg)
-                    except json.JSONDecodeError:
-                        continue
-
-        if not messages:
-            return None
-
-        # Get first user message as potential title
-        title = "Untitled Thread"
-        for msg in messages:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                if isinstance(content, str) and content.strip():
-                    # Truncate to reasonable length
-                    title = content[:100] + ("..." if len(content) > 100 else "")
-                    break
+                if not is_record_line(line):
+                    continue
+                count += 1
+
+                msg = None
+                if first_msg is None:
+                    msg = first_msg = parse_record(line)
+
+                # Get first user message as potential title; cheap byte test first
+                if _USER_ROLE_RE.search(line):
+                    if msg is None:
+                        msg = parse_record(line)
+                    if msg is not None and msg.get("role") == "user":
+                        content = msg.get("content", "")
+                        if isinstance(content, str) and content.strip():
+                            # Truncate to reasonable length
+                            title = content[:100] + ("..." if len(content) > 100 else "")
+                            break
+
+            if first_msg is None:
+                return None
+
+            count += count_records(f)
+            last_msg = read_last_record(f, f.seek(0, os.SEEK_END))
 
         return {
-            "title": title,
-            "message_count": len(messages),
-            "first_message_time": messages[0].get("timestamp") if messages else None,
-            "last_message_time": messages[-1].get("timestamp") if messages else None,
+            "title": title or "Untitled Thread",
+            "message_count": count,
+            "first_message_time": first_msg.get("timestamp"),
+            "last_message_time": last_msg.get("timestamp") if last_msg else None,
         }
 
     except IOError:
         return None
 
 
+def collect_sessions(sessions_dir, limit=None):
+    """
+    Summarize the session files in a directory, most recently modified first.
+
+    Files are ordered by mtime from the directory scan, so with a limit only
+    the `limit` newest files are parsed.
+    """
+    if not os.path.isdir(sessions_dir):
+        return []
+
+    entries = [(entry.stat().st_mtime_ns, entry.path) for entry in iter_session_entries(sessions_dir)]
+    if limit and len(entries) > limit:
+        entries = heapq.nlargest(limit, entries)
+    else:
+        entries.sort(reverse=True)
+
+    sessions = []
+    for _, path in entries:
+        session_info = get_session_info(path)
+        if session_info:
+            sessions.append({
+                "file": path,
+                "info": session_info
+            })
+    return sessions
+
+
 def main():
     parser = argparse.ArgumentParser(description="Locate Claude Code session files")
     parser.add_argument("--mode", choices=["current", "list", "project"], default="current",
@@ -134,8 +360,12 @@ def main():
     parser.add_argument("--session-file", type=str, help="Explicit session file path")
     parser.add_argument("--project-dir", type=str, help="Explicit project directory path")
     parser.add_argument("--cwd", type=str, help="Current working directory (default: actual cwd)")
+    parser.add_argument("--limit", type=int, default=20,
+                       help="Max sessions per project in list/project modes, newest first (0 = all)")
 
     args = parser.parse_args()
+    if args.limit < 0:
+        parser.error("--limit must be at least 0")
 
     if args.mode == "current":
         # Find current session
@@ -163,34 +393,23 @@ def main():
                 "session_info": session_info
             }
 
-        print(json.dumps(result, indent=2))
+        print_json(result)
 
     elif args.mode == "list":
         # List all projects and their sessions
         projects_root = find_claude_projects_root()
         if not projects_root:
-            print(json.dumps({"error": "Claude projects directory not found"}, indent=2))
+            print_json({"error": "Claude projects directory not found"})
             sys.exit(1)
 
         projects = []
-        for project_dir in projects_root.iterdir():
-            if not project_dir.is_dir():
-                continue
-
-            sessions = []
-            sessions_dir = project_dir / "sessions"
-            if sessions_dir.exists():
-                for session_file in sessions_dir.glob("*.jsonl"):
-                    session_info = get_session_info(session_file)
-                    if session_info:
-                        sessions.append({
-                            "file": str(session_file),
-                            "info": session_info
-                        })
+        with os.scandir(projects_root) as it:
+            project_dirs = [entry.path for entry in it if entry.is_dir()]
 
+        for project_dir in project_dirs:
             projects.append({
-                "directory": str(project_dir),
-                "sessions": sorted(sessions, key=lambda s: s["info"]["last_message_time"] or "", reverse=True)
+                "directory": project_dir,
+                "sessions": collect_sessions(os.path.join(project_dir, "sessions"), args.limit)
             })
 
         result = {
@@ -198,7 +417,7 @@ def main():
             "projects": projects
         }
 
-        print(json.dumps(result, indent=2))
+        print_json(result)
 
     elif args.mode == "project":
         # Find project for a specific directory
@@ -206,21 +425,10 @@ def main():
         project_dir = find_project_for_cwd(cwd)
 
         if project_dir:
-            sessions = []
-            sessions_dir = project_dir / "sessions"
-            if sessions_dir.exists():
-                for session_file in sessions_dir.glob("*.jsonl"):
-                    session_info = get_session_info(session_file)
-                    if session_info:
-                        sessions.append({
-                            "file": str(session_file),
-                            "info": session_info
-                        })
-
             result = {
                 "cwd": str(cwd),
                 "project_dir": str(project_dir),
-                "sessions": sorted(sessions, key=lambda s: s["info"]["last_message_time"] or "", reverse=True)
+                "sessions": collect_sessions(os.path.join(project_dir, "sessions"), args.limit)
             }
         else:
             result = {
@@ -229,7 +437,7 @@ def main():
                 "sessions": []
             }
 
-        print(json.dumps(result, indent=2))
+        print_json(result)
 
 
 if __name__ == "__main__":
@@ -7,26 +7,67 @@ This script deletes GitHub Gists that were created by the thread publisher.
 
 import argparse
 import json
-import os
 import sys
+import time
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-
+from urllib.parse import parse_qs, urlparse
+
+from gist_common import GITHUB_API, make_session, read_json_file, write_json_file
+
+GISTS_PER_PAGE = 100  # GitHub's maximum for GET /gists
+# GitHub asks clients not to hammer mutating endpoints concurrently, so keep
+# the delete fan-out small and back off when it pushes back.
+DELETE_WORKERS = 4
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_RATE_LIMIT_WAIT = 60
+PUBLISHER_FILES = frozenset({"index.html", "thread.json", "metadata.json"})
+
+
+def rate_limit_wait(response):
+    """Seconds to wait before retrying a rate-limited response, or None to not retry."""
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return min(int(retry_after), MAX_RATE_LIMIT_WAIT)
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset = response.headers.get("X-RateLimit-Reset", "")
+        if reset.isdigit():
+            wait = int(reset) - time.time()
+            # Primary limit resets can be up to an hour away; don't hang that long.
+            if wait <= MAX_RATE_LIMIT_WAIT:
+                return max(wait, 0)
+    return None
 
 class GistDeleter:
     def __init__(self, config_path="~/.claude/thread-publisher/config.json", index_path="~/.claude/thread-publisher/index.json"):
         self.config_path = Path(config_path).expanduser()
         self.index_path = Path(index_path).expanduser()
-        self.config = self.load_config()
-        self.index = self.load_index()
+        # Loaded on first use: --gist-id never reads the index, --list never needs the config.
+        self._config = None
+        self._index = None
+        self._session = make_session()
+        self._auth_headers = None
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = self.load_config()
+        return self._config
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self.load_index()
+        return self._index
 
     def load_config(self):
         """Load configuration from file."""
         if self.config_path.exists():
             try:
-                with open(self.config_path, 'r') as f:
-                    return json.load(f)
+                return read_json_file(self.config_path)
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Warning: Could not load config: {e}", file=sys.stderr)
 
@@ -39,8 +80,7 @@ class GistDeleter:
         """Load thread-to-gist index from file."""
         if self.index_path.exists():
             try:
-                with open(self.index_path, 'r') as f:
-                    return json.load(f)
+                return read_json_file(self.index_path)
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Warning: Could not load index: {e}", file=sys.stderr)
 
@@ -50,8 +90,7 @@ class GistDeleter:
         """Save thread-to-gist index to file."""
         try:
             self.index_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.index_path, 'w') as f:
-                json.dump(self.index, f, indent=2)
+            write_json_file(self.index_path, self.index)
             return True
         except IOError as e:
             print(f"Error saving index: {e}", file=sys.stderr)
@@ -66,24 +105,33 @@ class GistDeleter:
             return None
         return token
 
+    def get_auth_headers(self):
+        """Return the Authorization header, resolving the token only once."""
+        if self._auth_headers is None:
+            token = self.get_github_token()
+            if not token:
+                return None
+            self._auth_headers = {"Authorization": f"token {token}"}
+        return self._auth_headers
+
     def delete_gist(self, gist_id):
         """Delete a Gist by ID."""
-        token = self.get_github_token()
-        if not token:
+        headers = self.get_auth_headers()
+        if not headers:
             return None
 
-        headers = {
-            "Authorization": f"token {token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
-
         try:
-            response = requests.delete(
-                f"https://api.github.com/gists/{gist_id}",
-                headers=headers,
-                timeout=30
-            )
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                response = self._session.delete(
+                    f"{GITHUB_API}/gists/{gist_id}",
+                    headers=headers,
+                    timeout=30
+                )
+                wait = rate_limit_wait(response)
+                if wait is None or attempt == MAX_RATE_LIMIT_RETRIES:
+                    break
+                print(f"Rate limited deleting {gist_id}; retrying in {wait:.0f}s", file=sys.stderr)
+                time.sleep(wait)
 
             if response.status_code == 204:
                 return {"success": True, "gist_id": gist_id}
@@ -176,73 +224,115 @@ class GistDeleter:
         """List all published threads."""
         return self.index["threads"]
 
+    def fetch_gists_page(self, headers, page=None, url=None):
+        """Fetch one page of the authenticated user's gists."""
+        if url:
+            response = self._session.get(url, headers=headers, timeout=30)
+        else:
+            params = {"per_page": GISTS_PER_PAGE}
+            if page:
+                params["page"] = page
+            response = self._session.get(f"{GITHUB_API}/gists", headers=headers, params=params, timeout=30)
+        response.raise_for_status()
+        return response
+
+    def list_all_gists(self, headers):
+        """
+        Fetch every gist for the authenticated user.
+
+        The first response's Link header tells us the last page number, so the
+        remaining pages are fetched concurrently. If GitHub omits rel="last",
+        fall back to following rel="next" one page at a time.
+        """
+        response = self.fetch_gists_page(headers)
+        all_gists = response.json()
+        if "next" not in response.links:
+            return all_gists
+
+        last_url = response.links.get("last", {}).get("url")
+        last_page = parse_qs(urlparse(last_url).query).get("page", [None])[0] if last_url else None
+        if last_page and last_page.isdigit():
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                pages = pool.map(
+                    lambda page: self.fetch_gists_page(headers, page=page).json(),
+                    range(2, int(last_page) + 1)
+                )
+                for gists in pages:
+                    all_gists.extend(gists)
+            return all_gists
+
+        next_url = response.links["next"]["url"]
+        while next_url:
+            response = self.fetch_gists_page(headers, url=next_url)
+            all_gists.extend(response.json())
+            next_url = response.links.get("next", {}).get("url")
+        return all_gists
+
     def cleanup_orphaned_gists(self, dry_run=True):
         """Find and optionally delete gists that are no longer in the index."""
-        token = self.get_github_token()
-        if not token:
+        headers = self.get_auth_headers()
+        if not headers:
             return None
 
-        headers = {
-            "Authorization": f"token {token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
-
         try:
             # Get all gists for the authenticated user
-            response = requests.get(
-                "https://api.github.com/gists",
-                headers=headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            all_gists = response.json()
-
-            # Find gists that look like they were created by this tool
-            candidate_gists = []
+            all_gists = self.list_all_gists(headers)
+
+            # Classify in one pass: count gists that look like they were created
+            # by this tool and keep only those missing from our index
+            known_gist_ids = {info["gist_id"] for info in self.index["threads"].values()}
+            candidate_count = 0
+            orphaned_gists = []
             for gist in all_gists:
-                description = gist.get("description", "")
+                description = gist.get("description") or ""
                 files = gist.get("files", {})
 
                 # Look for indicators this is a thread publisher gist
-                if ("Claude Code Thread:" in description or
-                    any(filename in ["index.html", "thread.json", "metadata.json"]
-                       for filename in files.keys())):
-                    candidate_gists.append({
-                        "id": gist["id"],
-                        "description": description,
-                        "created_at": gist["created_at"],
-                        "updated_at": gist["updated_at"],
-                        "html_url": gist["html_url"],
-                        "files": list(files.keys())
-                    })
-
-            # Check which ones are in our index
-            known_gist_ids = {info["gist_id"] for info in self.index["threads"].values()}
-            orphaned_gists = [gist for gist in candidate_gists if gist["id"] not in known_gist_ids]
-
-            print(f"Found {len(candidate_gists)} thread publisher gists")
+                if not ("Claude Code Thread:" in description or
+                        any(filename in PUBLISHER_FILES for filename in files)):
+                    continue
+                candidate_count += 1
+                if gist["id"] in known_gist_ids:
+                    continue
+                orphaned_gists.append({
+                    "id": gist["id"],
+                    "description": description,
+                    "created_at": gist["created_at"],
+                    "updated_at": gist["updated_at"],
+                    "html_url": gist["html_url"],
+                    "files": list(files)
+                })
+
+            print(f"Found {candidate_count} thread publisher gists")
             print(f"Found {len(orphaned_gists)} orphaned gists (not in index)")
 
             if orphaned_gists:
-                print("\nOrphaned gists:")
-                for gist in orphaned_gists:
-                    print(f"  {gist['id']}: {gist['description']}")
-                    print(f"    Created: {gist['created_at']}")
-                    print(f"    Files: {', '.join(gist['files'])}")
-                    print(f"    URL: {gist['html_url']}")
-                    print()
+                # One write for the whole listing rather than a print per line
+                sys.stdout.write("\nOrphaned gists:\n" + "".join(
+                    f"  {gist['id']}: {gist['description']}\n"
+                    f"    Created: {gist['created_at']}\n"
+                    f"    Files: {', '.join(gist['files'])}\n"
+                    f"    URL: {gist['html_url']}\n\n"
+                    for gist in orphaned_gists
+                ))
+                sys.stdout.flush()
 
                 if not dry_run:
                     response = input("Delete all orphaned gists? (yes/no): ").strip().lower()
                     if response in ["yes", "y"]:
                         deleted_count = 0
-                        for gist in orphaned_gists:
-                            if self.delete_gist(gist["id"]):
-                                deleted_count += 1
-                                print(f"Deleted: {gist['id']}")
-                            else:
-                                print(f"Failed to delete: {gist['id']}")
+                        with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as pool:
+                            futures = {
+                                pool.submit(self.delete_gist, gist["id"]): gist["id"]
+                                for gist in orphaned_gists
+                            }
+                            for future in as_completed(futures):
+                                gist_id = futures[future]
+                                if future.result():
+                                    deleted_count += 1
+                                    print(f"Deleted: {gist_id}")
+                                else:
+                                    print(f"Failed to delete: {gist_id}")
                         print(f"\nDeleted {deleted_count} orphaned gists.")
                     else:
                         print("Cleanup cancelled.")
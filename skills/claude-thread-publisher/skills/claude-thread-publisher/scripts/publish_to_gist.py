@@ -5,33 +5,95 @@ GitHub Gist publisher for Claude Code thread publisher.
 This script creates and updates GitHub Gists with rendered thread content.
 """
 
-import argparse
+import asyncio
+import hashlib
 import json
+import mmap
 import os
 import sys
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import orjson  # Optional: faster index/config serialization
+except ImportError:
+    orjson = None
+
+try:
+    import httpx  # Optional: HTTP/2 multiplexing for publish_many
+except ImportError:
+    httpx = None
+
+from gist_common import GITHUB_API, GITHUB_API_HEADERS, make_session, read_json_file, write_json_file
+
+# Shared across publishes; the three per-thread file reads are independent,
+# so on networked home directories they overlap instead of adding up.
+_IO_POOL = ThreadPoolExecutor(max_workers=4)
+
+
+def encode_json_body(payload):
+    """Serialize a request body to UTF-8 JSON once, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def read_text_file(path):
+    """Read a UTF-8 file, decoding straight from a memory map to skip a buffer copy."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, 'utf-8')
+
+
+def current_timestamp():
+    """UTC timestamp for index entries; taken once per publish and reused."""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def compute_content_hash(description, files):
+    """
+    Hash the gist description and file contents to detect no-op updates.
+
+    Uses blake2b with a 16-byte digest: faster than SHA-256 and a shorter
+    index entry. Unlike thread_hash this is only ever compared, never used
+    as a key, so the algorithm can change freely.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(description.encode('utf-8'))
+    for name in sorted(files):
+        hasher.update(b"\0" + name.encode('utf-8') + b"\0")
+        hasher.update(files[name]["content"].encode('utf-8'))
+    return hasher.hexdigest()
+
 
 class GistPublisher:
     def __init__(self, config_path="~/.claude/thread-publisher/config.json", index_path="~/.claude/thread-publisher/index.json"):
         self.config_path = Path(config_path).expanduser()
         self.index_path = Path(index_path).expanduser()
+        self._dirs_ensured = False
         self.config = self.load_config()
         self.index = self.load_index()
+        self.session = make_session()
+        self._auth_headers = None
 
     def ensure_config_dir(self):
-        """Ensure configuration directory exists."""
+        """Ensure configuration directory exists (once per publisher)."""
+        if self._dirs_ensured:
+            return
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
-        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.index_path.parent != self.config_path.parent:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._dirs_ensured = True
 
     def load_config(self):
         """Load configuration from file."""
         if self.config_path.exists():
             try:
-                with open(self.config_path, 'r') as f:
-                    return json.load(f)
+                return read_json_file(self.config_path)
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Warning: Could not load config: {e}", file=sys.stderr)
 
@@ -44,8 +106,7 @@ class GistPublisher:
         """Save configuration to file."""
         self.ensure_config_dir()
         try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            write_json_file(self.config_path, self.config)
             return True
         except IOError as e:
             print(f"Error saving config: {e}", file=sys.stderr)
@@ -55,8 +116,7 @@ class GistPublisher:
         """Load thread-to-gist index from file."""
         if self.index_path.exists():
             try:
-                with open(self.index_path, 'r') as f:
-                    return json.load(f)
+                return read_json_file(self.index_path)
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Warning: Could not load index: {e}", file=sys.stderr)
 
@@ -66,8 +126,7 @@ class GistPublisher:
         """Save thread-to-gist index to file."""
         self.ensure_config_dir()
         try:
-            with open(self.index_path, 'w') as f:
-                json.dump(self.index, f, indent=2)
+            write_json_file(self.index_path, self.index)
             return True
         except IOError as e:
             print(f"Error saving index: {e}", file=sys.stderr)
@@ -99,18 +158,21 @@ class GistPublisher:
             print("Error: Could not save GitHub token", file=sys.stderr)
             return None
 
+    def get_auth_headers(self):
+        """Return the Authorization header, resolving the token only once."""
+        if self._auth_headers is None:
+            token = self.ensure_github_token()
+            if not token:
+                return None
+            self._auth_headers = {"Authorization": f"token {token}"}
+        return self._auth_headers
+
     def create_gist(self, description, files, public=False):
         """Create a new Gist."""
-        token = self.ensure_github_token()
-        if not token:
+        headers = self.get_auth_headers()
+        if not headers:
             return None
 
-        headers = {
-            "Authorization": f"token {token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
-
         payload = {
             "description": description,
             "public": public,
@@ -118,10 +180,10 @@ class GistPublisher:
         }
 
         try:
-            response = requests.post(
-                "https://api.github.com/gists",
+            response = self.session.post(
+                f"{GITHUB_API}/gists",
                 headers=headers,
-                json=payload,
+                data=encode_json_body(payload),
                 timeout=30
             )
             response.raise_for_status()
@@ -138,26 +200,20 @@ class GistPublisher:
 
     def update_gist(self, gist_id, description, files):
         """Update an existing Gist."""
-        token = self.ensure_github_token()
-        if not token:
+        headers = self.get_auth_headers()
+        if not headers:
             return None
 
-        headers = {
-            "Authorization": f"token {token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
-
         payload = {
             "description": description,
             "files": files
         }
 
         try:
-            response = requests.patch(
-                f"https://api.github.com/gists/{gist_id}",
+            response = self.session.patch(
+                f"{GITHUB_API}/gists/{gist_id}",
                 headers=headers,
-                json=payload,
+                data=encode_json_body(payload),
                 timeout=30
             )
             response.raise_for_status()
@@ -172,66 +228,75 @@ class GistPublisher:
                     pass
             return None
 
-    def publish_thread(self, html_path, json_path, metadata_path, thread_hash, project_path=None, session_file=None, update_existing=True):
-        """Publish a thread to GitHub Gist."""
-        # Load files
+    def load_thread_files(self, html_path, json_path, metadata_path, now_iso):
+        """Read a rendered thread and build the Gist description and files."""
         try:
-            with open(html_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-
-            with open(json_path, 'r', encoding='utf-8') as f:
-                json_content = f.read()
-
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
+            html_content, json_content, metadata_text = _IO_POOL.map(
+                read_text_file, (html_path, json_path, metadata_path)
+            )
         except IOError as e:
             print(f"Error reading files: {e}", file=sys.stderr)
             return None
 
+        # Parse only to pull out fields; the raw text is uploaded as-is.
+        try:
+            metadata = json.loads(metadata_text)
+        except ValueError as e:
+            print(f"Error reading metadata {metadata_path}: {e}", file=sys.stderr)
+            return None
+        if not isinstance(metadata, dict):
+            print(f"Error reading metadata {metadata_path}: not a JSON object", file=sys.stderr)
+            return None
         title = metadata.get("title", "Claude Code Thread")
-        created_at = metadata.get("created_at", datetime.now().isoformat())
+        created_at = metadata.get("created_at", now_iso)
 
         description = f"Claude Code Thread: {title} ({created_at})"
 
         files = {
             "index.html": {"content": html_content},
             "thread.json": {"content": json_content},
-            "metadata.json": {"content": json.dumps(metadata, indent=2)}
+            "metadata.json": {"content": metadata_text}
         }
+        return title, description, files
+
+    def plan_publish(self, thread_hash, description, files, update_existing=True, force=False):
+        """
+        Decide whether a thread needs to be created, updated, or left alone.
 
-        # Check if we already have a Gist for this thread
+        "unchanged" trusts the index and never contacts GitHub, so a gist
+        deleted remotely goes unnoticed; force=True always sends the update.
+        """
         existing_entry = self.index["threads"].get(thread_hash)
-        public = not self.config.get("gists_private_by_default", True)
+        content_hash = compute_content_hash(description, files)
 
         if existing_entry and update_existing:
-            gist_id = existing_entry["gist_id"]
-            print(f"Updating existing Gist: {gist_id}")
-            result = self.update_gist(gist_id, description, files)
-            if result:
-                # Update index with new timestamp
-                existing_entry["last_published_at"] = datetime.now().isoformat()
-                existing_entry["project_path"] = project_path
-                existing_entry["session_file"] = session_file
-                self.save_index()
-                print(f"Updated existing Gist: {gist_id}")
-        else:
-            print("Creating new Gist...")
-            result = self.create_gist(description, files, public=public)
-            if result:
-                # Add to index
-                self.index["threads"][thread_hash] = {
-                    "gist_id": result["id"],
-                    "gist_url": result["html_url"],
-                    "last_published_at": datetime.now().isoformat(),
-                    "project_path": project_path,
-                    "session_file": session_file,
-                    "title": title
-                }
-                self.save_index()
-                print(f"Created new Gist: {result['id']}")
-
-        if not result:
-            return None
+            if not force and existing_entry.get("content_hash") == content_hash:
+                return "unchanged", existing_entry, content_hash
+            return "updated", existing_entry, content_hash
+        return "created", existing_entry, content_hash
+
+    def record_publish(self, action, result, thread_hash, title, content_hash, now_iso, project_path=None, session_file=None):
+        """Update the in-memory index after a successful API call."""
+        if action == "updated":
+            # Update index with new timestamp
+            existing_entry = self.index["threads"][thread_hash]
+            existing_entry["last_published_at"] = now_iso
+            existing_entry["project_path"] = project_path
+            existing_entry["session_file"] = session_file
+            existing_entry["content_hash"] = content_hash
+            print(f"Updated existing Gist: {result['id']}")
+        elif action == "created":
+            # Add to index
+            self.index["threads"][thread_hash] = {
+                "gist_id": result["id"],
+                "gist_url": result["html_url"],
+                "last_published_at": now_iso,
+                "project_path": project_path,
+                "session_file": session_file,
+                "title": title,
+                "content_hash": content_hash
+            }
+            print(f"Created new Gist: {result['id']}")
 
         return {
             "gist_id": result["id"],
@@ -239,9 +304,130 @@ class GistPublisher:
             "permalink": f"https://gistpreview.github.io/?{result['id']}",
             "thread_hash": thread_hash,
             "title": title,
-            "action": "updated" if existing_entry and update_existing else "created"
+            "action": action
         }
 
+    def publish_thread(self, html_path, json_path, metadata_path, thread_hash, project_path=None, session_file=None, update_existing=True, force=False):
+        """Publish a thread to GitHub Gist."""
+        now_iso = current_timestamp()
+        loaded = self.load_thread_files(html_path, json_path, metadata_path, now_iso)
+        if not loaded:
+            return None
+        title, description, files = loaded
+
+        action, existing_entry, content_hash = self.plan_publish(thread_hash, description, files, update_existing, force)
+
+        if action == "unchanged":
+            # Nothing changed since the last publish; skip the PATCH.
+            print(f"Gist already up to date: {existing_entry['gist_id']}")
+            result = {"id": existing_entry["gist_id"], "html_url": existing_entry["gist_url"]}
+        elif action == "updated":
+            print(f"Updating existing Gist: {existing_entry['gist_id']}")
+            result = self.update_gist(existing_entry["gist_id"], description, files)
+        else:
+            print("Creating new Gist...")
+            public = not self.config.get("gists_private_by_default", True)
+            result = self.create_gist(description, files, public=public)
+
+        if not result:
+            return None
+
+        published = self.record_publish(action, result, thread_hash, title, content_hash, now_iso, project_path, session_file)
+        if action != "unchanged":
+            self.save_index()
+        return published
+
+    def publish_many(self, threads, max_concurrency=8, use_httpx=True):
+        """
+        Publish several threads, sending the API calls concurrently.
+
+        Each item in ``threads`` is a dict of ``publish_thread`` keyword
+        arguments. With httpx installed (and ``use_httpx`` set) the requests
+        share one HTTP/2 connection; otherwise threads are published one by
+        one over the requests session. Results are returned in input order,
+        with None for threads that failed; one failure never stops the rest.
+        """
+        if httpx is None or not use_httpx:
+            return [self.publish_thread(**thread) for thread in threads]
+
+        headers = self.get_auth_headers()
+        if not headers:
+            return [None] * len(threads)
+
+        # Gists created before an unexpected error must still reach the index,
+        # or the next run would publish them again.
+        changed = []
+        try:
+            results = asyncio.run(self._publish_many_async(threads, headers, max_concurrency, changed))
+        finally:
+            if changed:
+                self.save_index()
+        return results
+
+    async def _publish_many_async(self, threads, auth_headers, max_concurrency, changed):
+        semaphore = asyncio.Semaphore(max_concurrency)
+        now_iso = current_timestamp()
+        public = not self.config.get("gists_private_by_default", True)
+
+        async def publish_one(client, thread):
+            loaded = self.load_thread_files(thread["html_path"], thread["json_path"], thread["metadata_path"], now_iso)
+            if not loaded:
+                return None
+            title, description, files = loaded
+            thread_hash = thread["thread_hash"]
+            action, existing_entry, content_hash = self.plan_publish(
+                thread_hash, description, files, thread.get("update_existing", True), thread.get("force", False)
+            )
+
+            if action == "unchanged":
+                print(f"Gist already up to date: {existing_entry['gist_id']}")
+                result = {"id": existing_entry["gist_id"], "html_url": existing_entry["gist_url"]}
+            else:
+                if action == "updated":
+                    request = client.patch(
+                        f"/gists/{existing_entry['gist_id']}",
+                        content=encode_json_body({"description": description, "files": files})
+                    )
+                else:
+                    request = client.post(
+                        "/gists",
+                        content=encode_json_body({"description": description, "public": public, "files": files})
+                    )
+                try:
+                    async with semaphore:
+                        response = await request
+                    response.raise_for_status()
+                    result = response.json()
+                except (httpx.HTTPError, ValueError) as e:
+                    print(f"Error publishing thread {thread_hash[:16]}: {e}", file=sys.stderr)
+                    return None
+
+            published = self.record_publish(
+                action, result, thread_hash, title, content_hash, now_iso,
+                thread.get("project_path"), thread.get("session_file")
+            )
+            if action != "unchanged":
+                changed.append(thread_hash)
+            return published
+
+        try:
+            client = httpx.AsyncClient(base_url=GITHUB_API, http2=True, timeout=30,
+                                       headers={**GITHUB_API_HEADERS, **auth_headers})
+        except ImportError:
+            # http2=True needs the optional h2 package; fall back to HTTP/1.1.
+            client = httpx.AsyncClient(base_url=GITHUB_API, timeout=30,
+                                       headers={**GITHUB_API_HEADERS, **auth_headers})
+        async with client:
+            results = await asyncio.gather(
+                *(publish_one(client, thread) for thread in threads), return_exceptions=True
+            )
+
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                print(f"Error publishing thread {threads[i]['thread_hash'][:16]}: {result}", file=sys.stderr)
+                results[i] = None
+        return results
+
     def list_published_threads(self):
         """List all published threads."""
         return self.index["threads"]
@@ -251,20 +437,50 @@ class GistPublisher:
         return self.index["threads"].get(thread_hash)
 
 
+def print_published_threads(publisher):
+    """Print a summary of every thread in the index."""
+    threads = publisher.list_published_threads()
+    if not threads:
+        print("No published threads found.")
+        return
+    print(f"Found {len(threads)} published threads:")
+    for thread_hash, info in threads.items():
+        print(f"  {thread_hash[:16]}...")
+        print(f"    Title: {info.get('title', 'Unknown')}")
+        print(f"    Gist: {info.get('gist_url', 'Unknown')}")
+        print(f"    Published: {info.get('last_published_at', 'Unknown')}")
+        print(f"    Permalink: https://gistpreview.github.io/?{info.get('gist_id', 'unknown')}")
+        print()
+
+
 def main():
+    # Fast path for a bare `--list`: skip building (and importing) argparse.
+    if sys.argv[1:] == ["--list"]:
+        print_published_threads(GistPublisher())
+        return
+
+    import argparse
+
     parser = argparse.ArgumentParser(description="Publish Claude Code thread to GitHub Gist")
-    parser.add_argument("--html", required=True, help="HTML file path")
-    parser.add_argument("--thread-json", required=True, help="Thread JSON file path")
-    parser.add_argument("--metadata", required=True, help="Metadata file path")
+    parser.add_argument("--html", required=True, action="append",
+                        help="HTML file path (repeat --html/--thread-json/--metadata to publish several threads)")
+    parser.add_argument("--thread-json", required=True, action="append", help="Thread JSON file path")
+    parser.add_argument("--metadata", required=True, action="append", help="Metadata file path")
     parser.add_argument("--config", help="Config file path (default: ~/.claude/thread-publisher/config.json)")
     parser.add_argument("--index", help="Index file path (default: ~/.claude/thread-publisher/index.json)")
-    parser.add_argument("--project-path", help="Project path for metadata")
-    parser.add_argument("--session-file", help="Session file path for metadata")
+    parser.add_argument("--project-path",
+                        help="Project path for metadata (with several threads, read from each metadata file)")
+    parser.add_argument("--session-file",
+                        help="Session file path for metadata (with several threads, read from each metadata file)")
     parser.add_argument("--no-update", action="store_true", help="Don't update existing gist, always create new")
+    parser.add_argument("--force", action="store_true",
+                        help="Update the existing gist even if its content is unchanged (verifies it still exists)")
     parser.add_argument("--list", action="store_true", help="List all published threads")
     parser.add_argument("--thread-hash", help="Get info about specific thread hash")
 
     args = parser.parse_args()
+    if not len(args.html) == len(args.thread_json) == len(args.metadata):
+        parser.error("--html, --thread-json and --metadata must be given the same number of times")
 
     # Initialize publisher
     publisher = GistPublisher(
@@ -273,18 +489,7 @@ def main():
     )
 
     if args.list:
-        threads = publisher.list_published_threads()
-        if not threads:
-            print("No published threads found.")
-        else:
-            print(f"Found {len(threads)} published threads:")
-            for thread_hash, info in threads.items():
-                print(f"  {thread_hash[:16]}...")
-                print(f"    Title: {info.get('title', 'Unknown')}")
-                print(f"    Gist: {info.get('gist_url', 'Unknown')}")
-                print(f"    Published: {info.get('last_published_at', 'Unknown')}")
-                print(f"    Permalink: https://gistpreview.github.io/?{info.get('gist_id', 'unknown')}")
-                print()
+        print_published_threads(publisher)
         return
 
     if args.thread_hash:
@@ -296,25 +501,46 @@ def main():
             sys.exit(1)
         return
 
-    # Load metadata to get thread hash
-    try:
-        with open(args.metadata, 'r') as f:
-            metadata = json.load(f)
-        thread_hash = metadata["thread_hash"]
-    except (IOError, json.JSONDecodeError, KeyError) as e:
-        print(f"Error reading metadata: {e}", file=sys.stderr)
-        sys.exit(1)
+    # Load metadata to get thread hashes
+    threads = []
+    for html_path, json_path, metadata_path in zip(args.html, args.thread_json, args.metadata):
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+            thread_hash = metadata["thread_hash"]
+        except (IOError, json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"Error reading metadata {metadata_path}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        if len(args.metadata) == 1:
+            project_path, session_file = args.project_path, args.session_file
+        else:
+            source = metadata.get("source") or {}
+            project_path, session_file = source.get("project_path"), source.get("session_file")
+
+        threads.append({
+            "html_path": html_path,
+            "json_path": json_path,
+            "metadata_path": metadata_path,
+            "thread_hash": thread_hash,
+            "project_path": project_path,
+            "session_file": session_file,
+            "update_existing": not args.no_update,
+            "force": args.force
+        })
+
+    if len(threads) > 1:
+        results = publisher.publish_many(threads)
+        print(json.dumps(results, indent=2))
+        failed = sum(1 for r in results if r is None)
+        if failed:
+            print(f"❌ Failed to publish {failed} of {len(results)} threads", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ Published {len(results)} threads")
+        return
 
     # Publish thread
-    result = publisher.publish_thread(
-        html_path=args.html,
-        json_path=args.thread_json,
-        metadata_path=args.metadata,
-        thread_hash=thread_hash,
-        project_path=args.project_path,
-        session_file=args.session_file,
-        update_existing=not args.no_update
-    )
+    result = publisher.publish_thread(**threads[0])
 
     if result:
         print(json.dumps(result, indent=2))
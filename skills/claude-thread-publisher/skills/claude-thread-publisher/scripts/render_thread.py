@@ -6,33 +6,51 @@ This script converts Claude Code JSONL sessions into normalized JSON and beautif
 """
 
 import argparse
+import functools
 import hashlib
 import json
-import os
+import math
 import sys
 from datetime import datetime
 from pathlib import Path
 import html
 import re
 
+from gist_common import json_loads, write_json_file
+
+# Markdown and title-cleanup patterns, compiled once per process.
+_RE_INLINE = re.compile(r'`([^`]+)`')
+_RE_BOLD_STAR = re.compile(r'\*\*([^*]+)\*\*')
+_RE_BOLD_UND = re.compile(r'__([^_]+)__')
+_RE_ITAL_STAR = re.compile(r'\*([^*]+)\*')
+_RE_ITAL_UND = re.compile(r'_([^_]+)_')
+# Stands in for a code span while emphasis is applied; escaped text has no '<'.
+_CODE_PLACEHOLDER = '<code></code>'
+_RE_MD_STRIP = re.compile(r'[#*`\[\]()]')
+_RE_WS = re.compile(r'\s+')
+
+# Tool call inputs/outputs longer than this are cut off in the HTML.
+TOOL_VALUE_LIMIT = 500
+
 
 def parse_jsonl_session(session_file):
     """Parse a Claude Code JSONL session file into normalized format."""
     messages = []
 
     try:
-        with open(session_file, 'r') as f:
+        # Binary lines go straight to the parser; no text decoding pass
+        with open(session_file, 'rb') as f:
             for line_num, line in enumerate(f, 1):
                 line = line.strip()
                 if not line:
                     continue
 
                 try:
-                    msg = json.loads(line)
+                    msg = json_loads(line)
                     normalized = normalize_message(msg, line_num)
                     if normalized:
                         messages.append(normalized)
-                except json.JSONDecodeError as e:
+                except ValueError as e:
                     # Skip malformed lines but continue processing
                     print(f"Warning: Skipping malformed JSON at line {line_num}: {e}", file=sys.stderr)
                     continue
@@ -55,8 +73,7 @@ def normalize_message(msg, line_num=None):
         if isinstance(timestamp, (int, float)):
             try:
                 # Assume Unix timestamp
-                dt = datetime.fromtimestamp(timestamp)
-                timestamp = dt.isoformat()
+                timestamp = unix_timestamp_to_iso(timestamp)
             except (ValueError, OSError):
                 timestamp = None
         elif isinstance(timestamp, str):
@@ -85,23 +102,51 @@ def normalize_message(msg, line_num=None):
     }
 
 
-def compute_thread_hash(messages):
-    """Compute SHA-256 hash of normalized thread content."""
-    # Create a deterministic representation for hashing
-    hash_content = {
-        "messages": [
-            {
-                "role": msg["role"],
-                "timestamp": msg["timestamp"],
-                "content": msg["content"],
-                "tool_calls": msg["tool_calls"]
-            }
-            for msg in messages
-        ]
-    }
+@functools.lru_cache(maxsize=1024)
+def local_datetime(seconds):
+    """datetime.fromtimestamp for a whole second; messages cluster on a few seconds."""
+    return datetime.fromtimestamp(seconds)
+
 
-    content_str = json.dumps(hash_content, sort_keys=True, separators=(',', ':'))
-    return hashlib.sha256(content_str.encode('utf-8')).hexdigest()
+def unix_timestamp_to_iso(ts):
+    """Same result as datetime.fromtimestamp(ts).isoformat(), cached per second."""
+    if isinstance(ts, int):
+        return local_datetime(ts).isoformat()
+
+    # Split off microseconds the way fromtimestamp does (round half to even)
+    frac, seconds = math.modf(ts)
+    microsecond = round(frac * 1e6)
+    if microsecond >= 1000000:
+        microsecond -= 1000000
+        seconds += 1
+    elif microsecond < 0:
+        microsecond += 1000000
+        seconds -= 1
+    return local_datetime(int(seconds)).replace(microsecond=microsecond).isoformat()
+
+
+def compute_thread_hash(messages):
+    """Compute SHA-256 hash of normalized thread content.
+
+    The hash is the persisted key in the publisher's index.json, so it must
+    stay SHA-256; switching algorithms would orphan every published gist.
+    """
+    # Hash the deterministic representation
+    #   {"messages": [{"content", "role", "timestamp", "tool_calls"}, ...]}
+    # (sorted keys, compact separators) one message at a time, so the digest
+    # is unchanged without building the whole thread as one string.
+    hasher = hashlib.sha256(b'{"messages":[')
+    for i, msg in enumerate(messages):
+        if i:
+            hasher.update(b',')
+        hasher.update(json.dumps({
+            "role": msg["role"],
+            "timestamp": msg["timestamp"],
+            "content": msg["content"],
+            "tool_calls": msg["tool_calls"]
+        }, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    hasher.update(b']}')
+    return hasher.hexdigest()
 
 
 def get_thread_title(messages):
@@ -111,8 +156,8 @@ def get_thread_title(messages):
             content = msg["content"]
             if isinstance(content, str) and content.strip():
                 # Remove markdown formatting and truncate
-                clean_content = re.sub(r'[#*`\[\]()]', '', content)
-                clean_content = re.sub(r'\s+', ' ', clean_content).strip()
+                clean_content = _RE_MD_STRIP.sub('', content)
+                clean_content = _RE_WS.sub(' ', clean_content).strip()
                 return clean_content[:100] + ("..." if len(clean_content) > 100 else "")
 
     return "Untitled Claude Code Thread"
@@ -122,50 +167,122 @@ def format_timestamp(ts):
     """Format timestamp for display."""
     if not ts:
         return "Unknown time"
+    if not isinstance(ts, str):
+        return ts
+    return format_iso_timestamp(ts)
+
 
+@functools.lru_cache(maxsize=4096)
+def format_iso_timestamp(ts):
+    """Parse and reformat one ISO timestamp; consecutive messages often share one."""
     try:
         dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
         return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except (ValueError, AttributeError):
+    except ValueError:
         return ts
 
 
+def render_inline_markdown(text, out):
+    """
+    Append escaped text to out with inline code, bold and italic converted to HTML.
+
+    Passes run in the order code, bold, italic, so `**` pairs up before a lone
+    `*` can open italics. Code span contents are swapped for a placeholder
+    during the emphasis passes and restored afterwards, so they are left as-is.
+
+    >>> out = []; render_inline_markdown('Glob *.py files, **important**', out); ''.join(out)
+    'Glob *.py files, <strong>important</strong>'
+    >>> out = []; render_inline_markdown('Compute 2 * 3, then see **Note** below', out); ''.join(out)
+    'Compute 2 * 3, then see <strong>Note</strong> below'
+    >>> out = []; render_inline_markdown('*x **y** z*', out); ''.join(out)
+    '<em>x <strong>y</strong> z</em>'
+    >>> out = []; render_inline_markdown('**Run `a*b*c`** now', out); ''.join(out)
+    '<strong>Run <code>a*b*c</code></strong> now'
+    """
+    codes = []
+
+    def stash_code(m):
+        codes.append(m.group(1))
+        return _CODE_PLACEHOLDER
+
+    if '`' in text:
+        text = _RE_INLINE.sub(stash_code, text)
+
+    if '*' in text or '_' in text:
+        # Bold
+        text = _RE_BOLD_STAR.sub(r'<strong>\1</strong>', text)
+        text = _RE_BOLD_UND.sub(r'<strong>\1</strong>', text)
+
+        # Italic
+        text = _RE_ITAL_STAR.sub(r'<em>\1</em>', text)
+        text = _RE_ITAL_UND.sub(r'<em>\1</em>', text)
+
+    if not codes:
+        out.append(text)
+        return
+
+    parts = text.split(_CODE_PLACEHOLDER)
+    out.append(parts[0])
+    for code, part in zip(codes, parts[1:]):
+        out.append(f'<code>{code}</code>')
+        out.append(part)
+
+
+def render_markdown(text):
+    """
+    Render escaped text: fenced ```lang blocks, then inline markdown between them.
+
+    Fences are located with a left-to-right str.find scan using the same rules
+    as the pattern r'```(\\w+)?\\n(.*?)\\n```' (DOTALL), but linear even when a
+    fence is never closed. Everything is collected into one list and joined once.
+    """
+    out = []
+    pos = 0
+    search = 0
+    n = len(text)
+    while True:
+        start = text.find('```', search)
+        if start < 0:
+            break
+
+        # Optional language tag: a run of word characters, then a newline
+        lang_end = start + 3
+        while lang_end < n and (text[lang_end].isalnum() or text[lang_end] == '_'):
+            lang_end += 1
+        if lang_end >= n or text[lang_end] != '\n':
+            search = start + 1
+            continue
+
+        end = text.find('\n```', lang_end + 1)
+        if end < 0:
+            # No closing fence here means none for any later opener either
+            break
+
+        # text is already escaped, so the body goes in as-is
+        lang = text[start + 3:lang_end] or "text"
+        render_inline_markdown(text[pos:start], out)
+        out.append(f'<pre><code class="language-{lang}">{text[lang_end + 1:end]}</code></pre>')
+        pos = search = end + 4
+
+    render_inline_markdown(text[pos:], out)
+    return ''.join(out)
+
+
 def render_content_to_html(content):
     """Convert message content to HTML, handling markdown."""
     if not isinstance(content, str):
         content = str(content)
 
-    # HTML escape first
-    html_content = html.escape(content)
-
-    # Basic markdown-like formatting
-    # Code blocks
-    html_content = re.sub(
-        r'```(\w+)?\n(.*?)\n```',
-        lambda m: f'<pre><code class="language-{m.group(1) or "text"}">{html.escape(m.group(2))}</code></pre>',
-        html_content,
-        flags=re.DOTALL
-    )
-
-    # Inline code
-    html_content = re.sub(
-        r'`([^`]+)`',
-        r'<code>\1</code>',
-        html_content
-    )
-
-    # Bold
-    html_content = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', html_content)
-    html_content = re.sub(r'__([^_]+)__', r'<strong>\1</strong>', html_content)
+    # HTML escape first, then basic markdown-like formatting and line breaks
+    return render_markdown(html.escape(content)).replace('\n', '<br>\n')
 
-    # Italic
-    html_content = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', html_content)
-    html_content = re.sub(r'_([^_]+)_', r'<em>\1</em>', html_content)
 
-    # Line breaks
-    html_content = html_content.replace('\n', '<br>\n')
-
-    return html_content
+def escape_truncated(value, limit=TOOL_VALUE_LIMIT):
+    """HTML-escape a tool value, cut to `limit` characters before escaping."""
+    text = value if isinstance(value, str) else str(value)
+    if len(text) > limit:
+        return html.escape(text[:limit]) + "..."
+    return html.escape(text)
 
 
 def render_tool_calls_to_html(tool_calls):
@@ -180,16 +297,10 @@ def render_tool_calls_to_html(tool_calls):
         html_parts.append(f'<div class="tool-name">🔧 {html.escape(call["name"])}</div>')
 
         if call.get("input"):
-            input_str = str(call["input"])
-            if len(input_str) > 500:
-                input_str = input_str[:500] + "..."
-            html_parts.append(f'<div class="tool-input"><strong>Input:</strong> <code>{html.escape(input_str)}</code></div>')
+            html_parts.append(f'<div class="tool-input"><strong>Input:</strong> <code>{escape_truncated(call["input"])}</code></div>')
 
         if call.get("output"):
-            output_str = str(call["output"])
-            if len(output_str) > 500:
-                output_str = output_str[:500] + "..."
-            html_parts.append(f'<div class="tool-output"><strong>Output:</strong> <pre>{html.escape(output_str)}</pre></div>')
+            html_parts.append(f'<div class="tool-output"><strong>Output:</strong> <pre>{escape_truncated(call["output"])}</pre></div>')
 
         html_parts.append('</div>')
 
@@ -197,169 +308,169 @@ def render_tool_calls_to_html(tool_calls):
     return '\n'.join(html_parts)
 
 
-def generate_html(messages, thread_hash, title, metadata=None):
-    """Generate complete HTML document for the thread."""
-
-    # HTML template
-    html_template = """<!DOCTYPE html>
+# Static page parts are plain strings (no brace escaping); only the small
+# header and footer fragments go through str.format.
+HTML_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
+    <title>"""
+
+HTML_STYLE = """</title>
     <style>
-        body {{
+        body {
             font-family: 'SF Mono', Monaco, 'Cascadia Code', 'Roboto Mono', Consolas, 'Courier New', monospace;
             line-height: 1.6;
             margin: 0;
             padding: 0;
             background-color: #1a1a1a;
             color: #e0e0e0;
-        }}
+        }
 
-        .container {{
+        .container {
             max-width: 900px;
             margin: 0 auto;
             padding: 20px;
-        }}
+        }
 
-        .header {{
+        .header {
             border-bottom: 2px solid #333;
             padding-bottom: 20px;
             margin-bottom: 30px;
-        }}
+        }
 
-        .title {{
+        .title {
             font-size: 1.5em;
             font-weight: bold;
             color: #fff;
             margin-bottom: 10px;
-        }}
+        }
 
-        .metadata {{
+        .metadata {
             font-size: 0.9em;
             color: #888;
-        }}
+        }
 
-        .message {{
+        .message {
             margin-bottom: 25px;
             padding: 15px;
             border-radius: 8px;
             border-left: 4px solid #444;
-        }}
+        }
 
-        .message.user {{
+        .message.user {
             background-color: #2d2d2d;
             border-left-color: #4CAF50;
-        }}
+        }
 
-        .message.assistant {{
+        .message.assistant {
             background-color: #1e1e1e;
             border-left-color: #2196F3;
-        }}
+        }
 
-        .message.system {{
+        .message.system {
             background-color: #2a2a2a;
             border-left-color: #FF9800;
-        }}
+        }
 
-        .message-header {{
+        .message-header {
             display: flex;
             justify-content: space-between;
             align-items: center;
             margin-bottom: 10px;
             font-size: 0.9em;
-        }}
+        }
 
-        .role {{
+        .role {
             font-weight: bold;
             text-transform: uppercase;
             padding: 2px 8px;
             border-radius: 4px;
             font-size: 0.8em;
-        }}
+        }
 
-        .role.user {{
+        .role.user {
             background-color: #4CAF50;
             color: white;
-        }}
+        }
 
-        .role.assistant {{
+        .role.assistant {
             background-color: #2196F3;
             color: white;
-        }}
+        }
 
-        .role.system {{
+        .role.system {
             background-color: #FF9800;
             color: white;
-        }}
+        }
 
-        .timestamp {{
+        .timestamp {
             color: #666;
             font-size: 0.8em;
-        }}
+        }
 
-        .content {{
+        .content {
             white-space: pre-wrap;
             word-wrap: break-word;
-        }}
+        }
 
-        .tool-calls {{
+        .tool-calls {
             margin-top: 15px;
             padding-top: 15px;
             border-top: 1px solid #333;
-        }}
+        }
 
-        .tool-call {{
+        .tool-call {
             background-color: #1a1a1a;
             padding: 10px;
             border-radius: 4px;
             margin-bottom: 10px;
-        }}
+        }
 
-        .tool-name {{
+        .tool-name {
             font-weight: bold;
             color: #9C27B0;
             margin-bottom: 5px;
-        }}
+        }
 
-        .tool-input, .tool-output {{
+        .tool-input, .tool-output {
             margin: 5px 0;
             font-size: 0.9em;
-        }}
+        }
 
-        .tool-input code, .tool-output pre {{
+        .tool-input code, .tool-output pre {
             background-color: #000;
             padding: 5px;
             border-radius: 3px;
             overflow-x: auto;
             display: block;
-        }}
+        }
 
-        pre {{
+        pre {
             background-color: #000;
             padding: 10px;
             border-radius: 4px;
             overflow-x: auto;
             margin: 10px 0;
-        }}
+        }
 
-        code {{
+        code {
             background-color: #333;
             padding: 2px 4px;
             border-radius: 3px;
-        }}
+        }
 
-        .footer {{
+        .footer {
             margin-top: 40px;
             padding-top: 20px;
             border-top: 1px solid #333;
             text-align: center;
             color: #666;
             font-size: 0.9em;
-        }}
+        }
 
-        .copy-button {{
+        .copy-button {
             position: fixed;
             top: 20px;
             right: 20px;
@@ -370,23 +481,23 @@ def generate_html(messages, thread_hash, title, metadata=None):
             border-radius: 5px;
             cursor: pointer;
             font-family: inherit;
-        }}
+        }
 
-        .copy-button:hover {{
+        .copy-button:hover {
             background-color: #555;
-        }}
+        }
 
-        @media (max-width: 768px) {{
-            .container {{
+        @media (max-width: 768px) {
+            .container {
                 padding: 10px;
-            }}
-            .copy-button {{
+            }
+            .copy-button {
                 position: relative;
                 top: auto;
                 right: auto;
                 margin-bottom: 20px;
-            }}
-        }}
+            }
+        }
     </style>
 </head>
 <body>
@@ -394,7 +505,9 @@ def generate_html(messages, thread_hash, title, metadata=None):
         <button class="copy-button" onclick="copyLink()">Copy Link</button>
 
         <div class="header">
-            <div class="title">{title}</div>
+            <div class="title">"""
+
+HEADER_TEMPLATE = """</div>
             <div class="metadata">
                 <div>Thread Hash: {thread_hash_short}</div>
                 <div>Generated: {generation_time}</div>
@@ -402,56 +515,74 @@ def generate_html(messages, thread_hash, title, metadata=None):
             </div>
         </div>
 
-        {messages_html}
+        """
+
+FOOTER_TEMPLATE = """
 
         <div class="footer">
             Generated from Claude Code conversation<br>
             <a href="{gist_url}" target="_blank" style="color: #666;">View on GitHub Gist</a>
         </div>
-    </div>
+    </div>"""
+
+HTML_SCRIPT = """
 
     <script>
-        function copyLink() {{
-            navigator.clipboard.writeText(window.location.href).then(function() {{
+        function copyLink() {
+            navigator.clipboard.writeText(window.location.href).then(function() {
                 const button = document.querySelector('.copy-button');
                 const originalText = button.textContent;
                 button.textContent = 'Copied!';
-                setTimeout(function() {{
+                setTimeout(function() {
                     button.textContent = originalText;
-                }}, 2000);
-            }});
-        }}
+                }, 2000);
+            });
+        }
     </script>
 </body>
 </html>"""
 
-    # Render individual messages
-    messages_html = []
-    for msg in messages:
-        content_html = render_content_to_html(msg["content"])
-        tool_calls_html = render_tool_calls_to_html(msg["tool_calls"])
-
-        message_html = f"""
-        <div class="message {msg['role']}">
+MESSAGE_TEMPLATE = """
+        <div class="message {role}">
             <div class="message-header">
-                <span class="role {msg['role']}">{msg['role']}</span>
-                <span class="timestamp">{format_timestamp(msg['timestamp'])}</span>
+                <span class="role {role}">{role}</span>
+                <span class="timestamp">{timestamp}</span>
             </div>
             <div class="content">{content_html}</div>
             {tool_calls_html}
         </div>"""
-        messages_html.append(message_html)
-
-    # Fill template
-    return html_template.format(
-        title=html.escape(title),
-        thread_hash_short=thread_hash[:16],
-        generation_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        message_count=len(messages),
-        messages_html='\n'.join(messages_html),
-        gist_url=metadata.get("gist_url", "#") if metadata else "#"
+
+
+def generate_html(messages, thread_hash, title, metadata=None):
+    """Generate complete HTML document for the thread."""
+    # Render individual messages
+    messages_html = '\n'.join(
+        MESSAGE_TEMPLATE.format(
+            role=html.escape(str(msg["role"])),
+            timestamp=format_timestamp(msg["timestamp"]),
+            content_html=render_content_to_html(msg["content"]),
+            tool_calls_html=render_tool_calls_to_html(msg["tool_calls"])
+        )
+        for msg in messages
     )
 
+    # Assemble the page
+    title_html = html.escape(title)
+    return ''.join([
+        HTML_HEAD,
+        title_html,
+        HTML_STYLE,
+        title_html,
+        HEADER_TEMPLATE.format(
+            thread_hash_short=thread_hash[:16],
+            generation_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            message_count=len(messages)
+        ),
+        messages_html,
+        FOOTER_TEMPLATE.format(gist_url=metadata.get("gist_url", "#") if metadata else "#"),
+        HTML_SCRIPT,
+    ])
+
 
 def main():
     parser = argparse.ArgumentParser(description="Render Claude Code session as HTML and JSON")
@@ -478,15 +609,20 @@ def main():
     thread_hash = compute_thread_hash(messages)
     title = get_thread_title(messages)
 
+    # Shared by thread.json and metadata.json so both record the same moment
+    now_iso = datetime.now().isoformat()
+    project_path = args.project_path or str(Path(args.input).parent.parent.parent)
+    session_file = args.session_file or str(Path(args.input))
+
     # Create normalized thread JSON
     thread_data = {
         "messages": messages,
         "thread_hash": thread_hash,
         "title": title,
         "source": {
-            "project_path": args.project_path or str(Path(args.input).parent.parent.parent),
-            "session_file": args.session_file or str(Path(args.input)),
-            "generated_at": datetime.now().isoformat()
+            "project_path": project_path,
+            "session_file": session_file,
+            "generated_at": now_iso
         }
     }
 
@@ -495,11 +631,11 @@ def main():
         "version": 1,
         "thread_hash": thread_hash,
         "title": title,
-        "created_at": datetime.now().isoformat(),
+        "created_at": now_iso,
         "message_count": len(messages),
         "source": {
-            "project_path": args.project_path or str(Path(args.input).parent.parent.parent),
-            "session_file": args.session_file or str(Path(args.input))
+            "project_path": project_path,
+            "session_file": session_file
         }
     }
 
@@ -514,16 +650,14 @@ def main():
 
     # Write JSON
     if args.output_json:
-        with open(args.output_json, 'w', encoding='utf-8') as f:
-            json.dump(thread_data, f, indent=2, ensure_ascii=False)
+        write_json_file(args.output_json, thread_data)
         print(f"JSON written to: {args.output_json}")
     else:
         print("JSON output not specified", file=sys.stderr)
 
     # Write metadata
     if args.metadata:
-        with open(args.metadata, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        write_json_file(args.metadata, metadata)
         print(f"Metadata written to: {args.metadata}")
 
     # Print summary for scripting
@@ -498,10 +498,17 @@ def __(filtered_df, mo):
     @staticmethod
     def get_pattern(pattern_name: str) -> str:
         """Get a specific pattern by name"""
-        return getattr(MarimoPatterns, pattern_name, "# Pattern not found")
+        return MarimoPatterns._PATTERNS.get(pattern_name, "# Pattern not found")
 
     @staticmethod
     def list_patterns() -> list:
         """List all available patterns"""
-        return [attr for attr in dir(MarimoPatterns)
-                if not attr.startswith('_') and attr != 'get_pattern' and attr != 'list_patterns']
\ No newline at end of file
+        return list(MarimoPatterns._PATTERN_NAMES)
+
+
+# The catalog is fixed once the class body has run; index it a single time
+MarimoPatterns._PATTERNS = {
+    name: value for name, value in vars(MarimoPatterns).items()
+    if not name.startswith('_') and isinstance(value, str)
+}
+MarimoPatterns._PATTERN_NAMES = tuple(sorted(MarimoPatterns._PATTERNS))
@@ -9,60 +9,166 @@ Usage:
   python get_transcript.py <url>                           # Output to stdout
   python get_transcript.py <url> --output transcript.txt   # Save to file
   python get_transcript.py <url1> <url2>                   # Multiple URLs
+  python get_transcript.py <url> --no-cache                # Skip the local cache
 
 Requires: pip install youtube-transcript-api
 """
 
 import argparse
+import json
+import os
+import random
 import re
 import sys
-from youtube_transcript_api import YouTubeTranscriptApi
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+import requests
+from youtube_transcript_api import FetchedTranscriptSnippet, YouTubeRequestFailed, YouTubeTranscriptApi
+
+# Transcripts are fetched in parallel, but only a few at a time by default:
+# YouTube blocks IPs that send bursts of requests.
+MAX_FETCH_WORKERS = 4
+
+# watch?v=, watch?...&v=, embed/, v/, shorts/ and youtu.be/ links in a
+# single pass, compiled once. Query parameters are skipped one at a time and
+# never past a '#', '/' or whitespace, which keeps the search linear.
+VIDEO_URL_RE = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#&/\s]*&)*?v=|embed/|v/|shorts/)|youtu\.be/)'
+    r'([a-zA-Z0-9_-]{11})'
+)
+VIDEO_ID_RE = re.compile(r'^[a-zA-Z0-9_-]{11}$')
+
+# Fetched transcripts are cached per video ID.
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "yt-transcript"
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+
+# Dropped connections, timeouts and HTTP errors from YouTube are retried with
+# exponential backoff. Blocks and missing transcripts are not: retrying
+# right away won't change the answer.
+TRANSIENT_ERRORS = (YouTubeRequestFailed, requests.ConnectionError, requests.Timeout)
+FETCH_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 10.0
+
+# YouTubeTranscriptApi wraps a requests.Session and is not thread-safe, so
+# each fetch worker keeps its own instance.
+_thread_local = threading.local()
 
 
 def extract_video_id(url):
     """Extract YouTube video ID from various URL formats."""
     url = url.strip()
 
-    patterns = [
-        r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([a-zA-Z0-9_-]{11})',
-        r'youtube\.com/watch\?.*v=([a-zA-Z0-9_-]{11})',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-
-    # If it's already just a video ID
-    if re.match(r'^[a-zA-Z0-9_-]{11}$', url):
+    # If it's already just a video ID; checked first since a bare ID
+    # can never match the URL pattern
+    if len(url) == 11 and VIDEO_ID_RE.match(url):
         return url
 
+    match = VIDEO_URL_RE.search(url)
+    if match:
+        return match.group(1)
+
     return None
 
 
-def get_transcript(video_id, include_timestamps=True):
-    """Get transcript for a single video. Returns (snippets, metadata) or None."""
+def get_api():
+    """Return this thread's YouTubeTranscriptApi, reusing its keep-alive connections."""
+    api = getattr(_thread_local, "api", None)
+    if api is None:
+        api = _thread_local.api = YouTubeTranscriptApi()
+    return api
+
+
+def fetch_with_retry(video_id):
+    """Fetch a transcript, retrying TRANSIENT_ERRORS with jittered exponential backoff."""
+    for attempt in range(FETCH_RETRIES + 1):
+        try:
+            return get_api().fetch(video_id)
+        except TRANSIENT_ERRORS:
+            if attempt == FETCH_RETRIES:
+                raise
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+            time.sleep(random.uniform(delay / 2, delay))
+
+
+def load_cached_transcript(video_id, cache_ttl=DEFAULT_CACHE_TTL):
+    """Return cached (snippets, metadata), or None if missing, stale or unreadable."""
+    cache_path = CACHE_DIR / f"{video_id}.json"
     try:
-        api = YouTubeTranscriptApi()
-        fetched = api.fetch(video_id)
+        if cache_ttl and time.time() - cache_path.stat().st_mtime > cache_ttl:
+            return None
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+        snippets = [FetchedTranscriptSnippet(**snippet) for snippet in data["snippets"]]
+        metadata = {
+            "language": data["language"],
+            "language_code": data["language_code"],
+        }
+        return snippets, metadata
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_cached_transcript(video_id, snippets, metadata):
+    """Write a transcript to the cache atomically; failures are ignored."""
+    tmp_path = None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                **metadata,
+                "snippets": [
+                    {"text": s.text, "start": s.start, "duration": s.duration}
+                    for s in snippets
+                ],
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, CACHE_DIR / f"{video_id}.json")
+    except OSError:
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def get_transcript(video_id, use_cache=True, cache_ttl=DEFAULT_CACHE_TTL):
+    """
+    Get transcript for a single video.
+
+    Returns (snippets, metadata, None) on success, or (None, None, exception)
+    so callers can report why a fetch failed.
+    """
+    if use_cache:
+        cached = load_cached_transcript(video_id, cache_ttl)
+        if cached is not None:
+            return cached + (None,)
+
+    try:
+        fetched = fetch_with_retry(video_id)
         metadata = {
             "language": fetched.language,
             "language_code": fetched.language_code,
         }
-        return fetched.snippets, metadata
     except Exception as e:
-        return None, None
+        return None, None, e
+
+    save_cached_transcript(video_id, fetched.snippets, metadata)
+    return fetched.snippets, metadata, None
 
 
 def format_transcript(snippets, include_timestamps=True):
-    """Format transcript for output."""
-    lines = []
-    for snippet in snippets:
-        if include_timestamps:
-            lines.append(f"{snippet.start:.2f}  {snippet.text}")
-        else:
-            lines.append(snippet.text)
-    return "\n".join(lines)
+    """Yield formatted transcript lines, each ending in a newline."""
+    if include_timestamps:
+        for snippet in snippets:
+            yield f"{snippet.start:.2f}  {snippet.text}\n"
+    else:
+        for snippet in snippets:
+            yield snippet.text + "\n"
 
 
 def main():
@@ -77,45 +183,71 @@ def main():
         "--no-timestamps", action="store_true",
         help="Exclude timestamps from output"
     )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always fetch from YouTube (the cache is still refreshed)"
+    )
+    parser.add_argument(
+        "--cache-ttl", type=int, default=DEFAULT_CACHE_TTL,
+        help="Max age in seconds of a cached transcript (default: 7 days, 0 = no expiry)"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=MAX_FETCH_WORKERS,
+        help=f"Transcripts to fetch in parallel (default: {MAX_FETCH_WORKERS})"
+    )
 
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
 
-    all_transcripts = []
+    jobs = [(url, extract_video_id(url)) for url in args.urls]
+    video_ids = [video_id for _, video_id in jobs if video_id]
 
-    for url in args.urls:
-        video_id = extract_video_id(url)
+    # Fetch concurrently; results come back in URL order
+    with ThreadPoolExecutor(max_workers=max(1, min(args.jobs, len(video_ids)))) as pool:
+        fetch = partial(get_transcript, use_cache=not args.no_cache, cache_ttl=args.cache_ttl)
+        results = pool.map(fetch, video_ids)
 
-        if not video_id:
-            print(f"Error: Invalid YouTube URL: {url}", file=sys.stderr)
-            continue
-
-        snippets, metadata = get_transcript(video_id)
-
-        if snippets is None:
-            print(f"Error: Could not fetch transcript for: {url}", file=sys.stderr)
-            continue
-
-        formatted = format_transcript(snippets, not args.no_timestamps)
-        header = (
-            f"# Transcript for {url}\n"
-            f"# Video ID: {video_id}\n"
-            f"# Language: {metadata['language']} ({metadata['language_code']})\n"
-            f"# Snippets: {len(snippets)}\n"
-        )
-        all_transcripts.append(f"{header}\n{formatted}")
-
-    if not all_transcripts:
+    # Transcripts are written as they are formatted; the output file is only
+    # opened once there is something to write.
+    out = None
+    try:
+        for url, video_id in jobs:
+            if not video_id:
+                print(f"Error: Invalid YouTube URL: {url}", file=sys.stderr)
+                continue
+
+            snippets, metadata, error = next(results)
+
+            if snippets is None:
+                # The exception class (TranscriptsDisabled, VideoUnavailable,
+                # IpBlocked, ...) tells permanent failures from transient ones
+                print(f"Error: Could not fetch transcript for: {url} ({type(error).__name__})", file=sys.stderr)
+                continue
+
+            if out is None:
+                out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+            else:
+                out.write("\n---\n\n")
+
+            out.write(
+                f"# Transcript for {url}\n"
+                f"# Video ID: {video_id}\n"
+                f"# Language: {metadata['language']} ({metadata['language_code']})\n"
+                f"# Snippets: {len(snippets)}\n"
+                "\n"
+            )
+            out.writelines(format_transcript(snippets, not args.no_timestamps))
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    if out is None:
         print("Error: No transcripts could be fetched.", file=sys.stderr)
         sys.exit(1)
 
-    output = "\n\n---\n\n".join(all_transcripts)
-
     if args.output:
-        with open(args.output, "w", encoding="utf-8") as f:
-            f.write(output)
         print(f"Transcript(s) saved to: {args.output}")
-    else:
-        print(output)
 
 
 if __name__ == "__main__":